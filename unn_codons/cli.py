@@ -0,0 +1,9 @@
+import argparse
+
+
+def positive_int(value):
+    """ argparse type for an integer that must be greater than 0 """
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0: {value}")
+    return number
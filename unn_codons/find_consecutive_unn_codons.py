@@ -2,8 +2,8 @@ import argparse
 import os
 import sys
 
-from .gbk import parse_gbk
-from .protein import consecutive_counts
+from . import cli, pipeline
+from .protein import cache, consecutive_counts
 from .tbl import consecutives_table 
 
 DESCRIPTION = """Find the consecutive UNN codons present in each protein in a set of
@@ -23,6 +23,28 @@ def parse_args():
         help="Path for output file (default is ./\{Version\}." \
              "consecutive_unn_codons.tsv)",
     )
+    parser.add_argument(
+        "--cache",
+        help="Path to a file used to store results for sequences that have " \
+             "already been seen, so they are reused across runs (default is " \
+             "to only reuse results within this run)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=cli.positive_int,
+        default=cache.DEFAULT_MAX_ENTRIES,
+        help="Maximum number of results kept in the cache (default is " \
+             f"{cache.DEFAULT_MAX_ENTRIES})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=cli.positive_int,
+        help="Number of processes used to parse the GenBank files, up to " \
+             "the number of files and at most " \
+             f"{pipeline.DEFAULT_QUEUE_SIZE}. With one process, files are " \
+             "parsed in turn without a process pool (default is the number " \
+             "of processors on the machine)",
+    )
     return parser.parse_args()
 
 
@@ -36,10 +58,16 @@ def get_output_path(output_param, genome_ids):
 
 def main():
     args = parse_args()
-    genome = parse_gbk.parse(args.genbank)
+    seq_cache = cache.SequenceCache(args.cache, args.cache_size)
+
+    def count(proteins):
+        return consecutive_counts.count(proteins, seq_cache)
+
+    genome = pipeline.run(args.genbank, count, args.workers)
     output = get_output_path(args.output, genome["ids"])
-    protein_stats = consecutive_counts.count(genome["proteins"])
-    consecutives_table.create_table(protein_stats, output)
+    consecutives_table.create_table(genome["proteins"], output)
+    seq_cache.save()
+    seq_cache.report()
 
 
 if __name__ == "__main__":
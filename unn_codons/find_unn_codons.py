@@ -2,8 +2,8 @@ import argparse
 import os
 import sys
 
-from .gbk import parse_gbk
-from .protein import codon_counts, unn_calculations
+from . import cli, pipeline
+from .protein import cache, codon_counts, unn_calculations
 from .tbl import table
 
 DESCRIPTION = """Find the UNN codons present in each protein in a set of GenBank
@@ -28,6 +28,28 @@ def parse_args():
              "calculations. If no file is given, then all UNN codons are " \
              "included",
     )
+    parser.add_argument(
+        "--cache",
+        help="Path to a file used to store results for sequences that have " \
+             "already been seen, so they are reused across runs (default is " \
+             "to only reuse results within this run)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=cli.positive_int,
+        default=cache.DEFAULT_MAX_ENTRIES,
+        help="Maximum number of results kept in the cache (default is " \
+             f"{cache.DEFAULT_MAX_ENTRIES})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=cli.positive_int,
+        help="Number of processes used to parse the GenBank files, up to " \
+             "the number of files and at most " \
+             f"{pipeline.DEFAULT_QUEUE_SIZE}. With one process, files are " \
+             "parsed in turn without a process pool (default is the number " \
+             "of processors on the machine)",
+    )
     return parser.parse_args()
 
 
@@ -54,16 +76,33 @@ def parse_include_file(path):
     return codons
 
 
+def calculate(protein, include):
+    """
+    Count the codons of a protein and calculate its UNN codon frequencies.
+    Only the calculations are cached, not the codon counts.
+    """
+    protein_stats = codon_counts.count([protein])
+    return unn_calculations.calculate(protein_stats, include)[0]
+
+
 def main():
     args = parse_args()
     include = parse_include_file(args.include)
-    genome = parse_gbk.parse(args.genbank)
+    seq_cache = cache.SequenceCache(args.cache, args.cache_size)
+
+    def count(proteins):
+        return [
+            seq_cache.get("unn_calculations", protein, calculate, include)
+            for protein in proteins
+        ]
+
+    genome = pipeline.run(args.genbank, count, args.workers)
     output = get_output_path(args.output, genome["ids"])
-    protein_stats = codon_counts.count(genome["proteins"])
-    unn_stats = unn_calculations.calculate(protein_stats, include)
-    main_table = table.create_main_table(unn_stats)
+    main_table = table.create_main_table(genome["proteins"])
     header_table = table.create_header_table(main_table)
     table.create_final_table(header_table, main_table, output)
+    seq_cache.save()
+    seq_cache.report()
 
 if __name__ == "__main__":
     main()
@@ -1,3 +1,4 @@
+import io
 import os
 
 from ..struct import gbk
@@ -15,7 +16,7 @@ def parse(paths):
         genome and plasmid is used)
     :returns <struct.gbk.RECORD>
     """
-    paths = _get_paths(paths)
+    paths = get_paths(paths)
     try:
         record = {"ids": [], "proteins": []}
         for path in paths:
@@ -28,7 +29,22 @@ def parse(paths):
         raise GenBankParsingError(f"Unable to parse {path}: {err}")
 
 
-def _get_paths(paths):
+def parse_text(path, text):
+    """
+    Parse the contents of a single GenBank file that has already been read
+    :param path <str>: path the contents were read from
+    :param text <str>: contents of the GenBank file
+    :returns <dict>: {"id": str, "proteins": list<struct.gbk.PROTEIN>}
+    """
+    try:
+        rec = _parse_genbank(io.StringIO(text))
+        gbk.RECORD.validate({"ids": [rec["id"]], "proteins": rec["proteins"]})
+        return rec
+    except Exception as err:
+        raise GenBankParsingError(f"Unable to parse {path}: {err}")
+
+
+def get_paths(paths):
     """ Get the GenBank file paths """
     if not paths:
         data_dir = os.path.normpath(
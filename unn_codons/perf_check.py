@@ -0,0 +1,455 @@
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import Bio
+import numpy
+import pandas
+import schema
+
+from . import cli, find_unn_codons
+from .gbk import parse_gbk
+from .protein import cache, consecutive_counts
+from .tbl import consecutives_table, table
+
+DESCRIPTION = """Run the unn and consec pipelines on fixed synthetic GenBank
+files and compare the time and peak memory of each stage to a stored baseline.
+Fails if any stage is slower or uses more memory than the baseline by more than
+the given thresholds."""
+
+# Version of the layout of the baseline file and of how it is measured
+BASELINE_FORMAT = 3
+
+# Standard genetic code, with codons in UCAG order
+BASES = "UCAG"
+AMINO_ACIDS = "FFLLSSSSYY**CC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG"
+CODON_TABLE = {
+    "".join(codon): aa
+    for codon, aa in zip(itertools.product(BASES, repeat=3), AMINO_ACIDS)
+}
+SENSE_CODONS = sorted(c for c, aa in CODON_TABLE.items() if aa != "*")
+STOP_CODONS = sorted(c for c, aa in CODON_TABLE.items() if aa == "*")
+
+class PerfError(Exception): pass
+class BaselineError(PerfError): pass
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument(
+        "--baseline",
+        default="perf_baseline.json",
+        help="Path to the baseline file (default is ./perf_baseline.json)",
+    )
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="Write the results to the baseline file instead of comparing " \
+             "them to it",
+    )
+    parser.add_argument(
+        "--time-threshold",
+        type=float,
+        default=25.0,
+        help="Maximum percentage a stage can be slower than the baseline " \
+             "(default is 25)",
+    )
+    parser.add_argument(
+        "--memory-threshold",
+        type=float,
+        default=10.0,
+        help="Maximum percentage the peak memory of a stage can be above " \
+             "the baseline (default is 10)",
+    )
+    parser.add_argument(
+        "--time-floor",
+        type=float,
+        default=0.05,
+        help="Changes in the time of a stage smaller than this many seconds " \
+             "are ignored (default is 0.05)",
+    )
+    parser.add_argument(
+        "--memory-floor",
+        type=float,
+        default=1.0,
+        help="Changes in the peak memory of a stage smaller than this many " \
+             "MiB are ignored (default is 1)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=cli.positive_int,
+        default=5,
+        help="Minimum number of times each stage is timed. The median time " \
+             "is kept (default is 5)",
+    )
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=1.0,
+        help="Minimum total seconds each stage is timed for, repeating it " \
+             "more than --repeat times if needed (default is 1)",
+    )
+    parser.add_argument(
+        "--genomes",
+        type=cli.positive_int,
+        default=2,
+        help="Number of synthetic GenBank files (default is 2)",
+    )
+    parser.add_argument(
+        "--proteins",
+        type=cli.positive_int,
+        default=2000,
+        help="Number of proteins in each synthetic GenBank file (default is " \
+             "2000)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed for the synthetic GenBank files (default is 0)",
+    )
+    return parser.parse_args()
+
+
+def write_synthetic_genbank(directory, genomes, proteins, seed):
+    """
+    Write GenBank files with random proteins
+    :param directory <str>: directory for the GenBank files
+    :param genomes <int>: number of GenBank files
+    :param proteins <int>: number of proteins in each GenBank file
+    :param seed <int>: seed for the random proteins
+    :returns <list<str>>: paths to the GenBank files
+    """
+    rng = random.Random(seed)
+    paths = []
+    for i in range(1, genomes + 1):
+        accession = f"SYN{i:05d}"
+        path = os.path.join(directory, f"{accession}.1.gbk")
+        with open(path, "w") as out:
+            out.write(_synthetic_record(accession, proteins, rng))
+        paths.append(path)
+    return paths
+
+
+def _synthetic_record(accession, proteins, rng):
+    """
+    Create a GenBank record where the CDSs follow each other on the forward
+    strand
+    :returns <str>: the GenBank record
+    """
+    features = []
+    sequence = []
+    start = 1
+    for j in range(1, proteins + 1):
+        n_codons = rng.randint(50, 500)
+        codons = ["AUG"]
+        codons.extend(rng.choice(SENSE_CODONS) for _ in range(n_codons))
+        codons.append(rng.choice(STOP_CODONS))
+        nt = "".join(codons).replace("U", "T")
+        translation = "".join(CODON_TABLE[c] for c in codons[:-1])
+        end = start + len(nt) - 1
+        features.append(f"     CDS             {start}..{end}\n")
+        features.append(_qualifier("gene", f"syn{j}"))
+        features.append(_qualifier("locus_tag", f"{accession}_{j:05d}"))
+        features.append(_qualifier("protein_id", f"{accession}_{j:05d}.1"))
+        features.append(_qualifier("translation", translation))
+        sequence.append(nt)
+        start = end + 1
+    sequence = "".join(sequence).lower()
+    length = len(sequence)
+    lines = [
+        f"LOCUS       {accession:<16}{length:>12} bp    DNA     circular " \
+        "BCT 01-JAN-2000\n",
+        f"DEFINITION  Synthetic genome {accession}.\n",
+        f"ACCESSION   {accession}\n",
+        f"VERSION     {accession}.1\n",
+        "FEATURES             Location/Qualifiers\n",
+        f"     source          1..{length}\n",
+    ]
+    lines.extend(features)
+    lines.append("ORIGIN\n")
+    for i in range(0, length, 60):
+        blocks = [sequence[k:k+10] for k in range(i, min(i + 60, length), 10)]
+        lines.append(f"{i + 1:>9} " + " ".join(blocks) + "\n")
+    lines.append("//\n")
+    return "".join(lines)
+
+
+def _qualifier(key, value):
+    """ Format a qualifier, wrapping it over several lines if needed """
+    text = f'/{key}="{value}"'
+    return "".join(
+        f"{'':21}{text[i:i+58]}\n" for i in range(0, len(text), 58)
+    )
+
+
+def unn_pipeline(texts, output):
+    """
+    Stages of the unn command, as (name, function). Codon counting and the UNN
+    calculations are one stage, as the command caches them together.
+    """
+    state = {}
+    def parse():
+        state["proteins"] = _parse_texts(texts)
+    def calculate():
+        seq_cache = cache.SequenceCache()
+        state["stats"] = [
+            seq_cache.get(
+                "unn_calculations",
+                protein,
+                find_unn_codons.calculate,
+                set(),
+            )
+            for protein in state["proteins"]
+        ]
+    def write_table():
+        main_table = table.create_main_table(state["stats"])
+        header_table = table.create_header_table(main_table)
+        table.create_final_table(header_table, main_table, output)
+    return [
+        ("parse", parse),
+        ("calculate", calculate),
+        ("table", write_table),
+    ]
+
+
+def consec_pipeline(texts, output):
+    """ Stages of the consec command, as (name, function) """
+    state = {}
+    def parse():
+        state["proteins"] = _parse_texts(texts)
+    def count():
+        state["counts"] = consecutive_counts.count(
+            state["proteins"], cache.SequenceCache()
+        )
+    def write_table():
+        consecutives_table.create_table(state["counts"], output)
+    return [
+        ("parse", parse),
+        ("count", count),
+        ("table", write_table),
+    ]
+
+
+def _parse_texts(texts):
+    """
+    Parse the GenBank files the way pipeline.run does, but in this process
+    :param texts <list<tuple>>: (path, contents) of each GenBank file
+    :returns <list<struct.gbk.PROTEIN>>: proteins of all of the files
+    """
+    proteins = []
+    for path, text in texts:
+        proteins.extend(parse_gbk.parse_text(path, text)["proteins"])
+    return proteins
+
+PIPELINES = {
+    "unn": unn_pipeline,
+    "consec": consec_pipeline,
+}
+
+
+def measure(paths, directory, repeat, min_time):
+    """
+    Measure the time and peak memory of each stage of each pipeline. Each stage
+    is timed at least `repeat` times and for at least `min_time` seconds, and
+    the median time is kept. Memory is measured in a separate run so that
+    tracing does not affect the times. The counting stages use a new
+    protein.cache.SequenceCache for every run, as the commands do.
+    :param paths <list<str>>: paths to the GenBank files
+    :param directory <str>: directory for the output tables
+    :param repeat <int>: minimum number of timed runs of each stage
+    :param min_time <float>: minimum total seconds of timed runs of each stage
+    :returns <dict>: {pipeline} -> {stage} -> {"seconds": float,
+        "peak_mib": float}
+    """
+    texts = []
+    for path in paths:
+        with open(path) as fh:
+            texts.append((path, fh.read()))
+    results = {}
+    for name, pipeline in PIPELINES.items():
+        output = os.path.join(directory, f"{name}.tsv")
+        stages = results.setdefault(name, {})
+        for stage, run in pipeline(texts, output):
+            times = []
+            while len(times) < repeat or sum(times) < min_time:
+                gc.collect()
+                start = time.perf_counter()
+                run()
+                times.append(time.perf_counter() - start)
+            gc.collect()
+            tracemalloc.start()
+            try:
+                run()
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            stages[stage] = {
+                "seconds": round(statistics.median(times), 4),
+                "peak_mib": round(peak / 1024 / 1024, 2),
+            }
+    return results
+
+
+def get_versions():
+    """ Get the versions of the dependencies on the hot path """
+    return {
+        "python": platform.python_version(),
+        "biopython": Bio.__version__,
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "schema": getattr(schema, "__version__", "unknown"),
+    }
+
+
+def read_baseline(path, inputs):
+    """
+    Read the baseline file and check it was made with the same inputs
+    :param path <str>: path to the baseline file
+    :param inputs <dict>: parameters of the synthetic GenBank files
+    :returns <dict>: the baseline
+    """
+    try:
+        with open(path) as fh:
+            baseline = json.load(fh)
+    except Exception as err:
+        raise BaselineError(f"Unable to read baseline {path}: {err}")
+    if baseline.get("format") != BASELINE_FORMAT:
+        raise BaselineError(
+            f"Baseline {path} has format {baseline.get('format')}, expected " \
+            f"{BASELINE_FORMAT}. Recreate it with --update"
+        )
+    if baseline["inputs"] != inputs:
+        raise BaselineError(
+            f"Baseline {path} was made with inputs {baseline['inputs']}, " \
+            f"not {inputs}"
+        )
+    return baseline
+
+
+def write_baseline(path, inputs, results):
+    """ Write the results to the baseline file """
+    baseline = {
+        "format": BASELINE_FORMAT,
+        "inputs": inputs,
+        "versions": get_versions(),
+        "stages": results,
+    }
+    with open(path, "w") as out:
+        json.dump(baseline, out, indent=2, sort_keys=True)
+        out.write("\n")
+
+
+def compare(baseline, results, time_threshold, memory_threshold,
+            time_floor, memory_floor):
+    """
+    Compare the results for each stage to the baseline. A stage whose baseline
+    is 0 fails if it is now above the floor.
+    :param baseline <dict>: from read_baseline()
+    :param results <dict>: from measure()
+    :param time_threshold <float>: maximum percentage increase in time
+    :param memory_threshold <float>: maximum percentage increase in memory
+    :param time_floor <float>: changes in time smaller than this many seconds
+        are ignored
+    :param memory_floor <float>: changes in memory smaller than this many MiB
+        are ignored
+    :returns <list<list>>: rows of [pipeline, stage, metric, baseline,
+        current, change (%), status]
+    """
+    thresholds = {
+        "seconds": time_threshold,
+        "peak_mib": memory_threshold,
+    }
+    floors = {
+        "seconds": time_floor,
+        "peak_mib": memory_floor,
+    }
+    rows = []
+    for name, stages in results.items():
+        for stage, stats in stages.items():
+            base_stats = baseline["stages"].get(name, {}).get(stage)
+            for metric, threshold in thresholds.items():
+                current = stats[metric]
+                if base_stats is None:
+                    rows.append(
+                        [name, stage, metric, None, current, None, "NEW"]
+                    )
+                    continue
+                base = base_stats[metric]
+                if base:
+                    change = round((current - base) / base * 100, 1)
+                    exceeded = change > threshold
+                else:
+                    change = None
+                    exceeded = current > 0
+                if exceeded and current - base >= floors[metric]:
+                    status = "FAIL"
+                else:
+                    status = "ok"
+                rows.append(
+                    [name, stage, metric, base, current, change, status]
+                )
+    return rows
+
+
+def print_report(rows, baseline):
+    """ Print the comparison and any differences in dependency versions """
+    versions = get_versions()
+    for dep, version in sorted(versions.items()):
+        base_version = baseline["versions"].get(dep)
+        if base_version != version:
+            print(f"{dep}: {base_version} (baseline) -> {version}")
+    print("\t".join([
+        "Pipeline", "Stage", "Metric", "Baseline", "Current", "Change (%)",
+        "Status",
+    ]))
+    for row in rows:
+        print("\t".join("-" if x is None else str(x) for x in row))
+
+
+def main():
+    args = parse_args()
+    inputs = {
+        "genomes": args.genomes,
+        "proteins": args.proteins,
+        "seed": args.seed,
+    }
+    baseline = None
+    if not args.update:
+        baseline = read_baseline(args.baseline, inputs)
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_synthetic_genbank(directory, **inputs)
+        results = measure(paths, directory, args.repeat, args.min_time)
+    if args.update:
+        write_baseline(args.baseline, inputs, results)
+        print(f"Wrote baseline to {args.baseline}")
+        return
+    rows = compare(
+        baseline,
+        results,
+        args.time_threshold,
+        args.memory_threshold,
+        args.time_floor,
+        args.memory_floor,
+    )
+    print_report(rows, baseline)
+    failed = [row for row in rows if row[-1] == "FAIL"]
+    if failed:
+        print(
+            f"FAILED: {len(failed)} stage metrics exceeded the thresholds",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import collections
+import concurrent.futures
+import multiprocessing
+import os
+import queue
+import threading
+
+from .gbk import parse_gbk
+
+# Maximum number of GenBank files that are being read, waiting to be parsed,
+# being parsed or waiting to be counted. Bounds memory use when reading is
+# faster than counting.
+DEFAULT_QUEUE_SIZE = 4
+
+# Seconds to wait for a free slot before checking if the pipeline has stopped
+_WAIT_TIMEOUT = 0.1
+
+# Marks the end of the files on the read queue
+_DONE = object()
+
+
+def run(paths, count, workers=None, queue_size=DEFAULT_QUEUE_SIZE):
+    """
+    Read, parse and count a set of GenBank files as a staged pipeline. Files
+    are read in a thread and parsed in a process pool while the proteins of
+    the files that have already been parsed are counted, so disk reads,
+    parsing and counting overlap.
+    :param paths <list<str>>: paths to the GenBank files (if null, the UTI89
+        genome and plasmid is used)
+    :param count <function>: called with the list<struct.gbk.PROTEIN> of each
+        GenBank file, in the order of `paths`, and returns a list of results
+    :param workers <int>: number of processes used to parse the files (if
+        null, the number of processors on the machine is used). No more
+        processes than files or than `queue_size` are started. If only one
+        would be started, the files are read, parsed and counted in turn in
+        this process instead.
+    :param queue_size <int>: maximum number of files that are being read,
+        waiting to be parsed, being parsed or waiting to be counted
+    :returns <dict>: {"ids": list<str>, "proteins": list} where proteins are
+        the results of `count` for all of the files
+    """
+    assert queue_size > 0, f"Invalid queue size: {queue_size}"
+    assert workers is None or workers > 0, f"Invalid workers: {workers}"
+    paths = parse_gbk.get_paths(paths)
+    workers = min(workers or os.cpu_count() or 1, queue_size, len(paths))
+    record = {"ids": [], "proteins": []}
+    if workers == 1:
+        for path in paths:
+            rec = parse_gbk.parse_text(path, _read_text(path))
+            _add(rec, count, record)
+        return record
+
+    texts = queue.Queue()
+    slots = threading.Semaphore(queue_size)  # released when a file is counted
+    stop = threading.Event()
+    pending = collections.deque()  # parsing futures, in the order of paths
+
+    # Worker processes are spawned rather than forked so that they never copy
+    # the reader thread's state, and the pool is created before the thread.
+    with concurrent.futures.ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as pool:
+        reader = threading.Thread(
+            target=_read,
+            args=(paths, texts, slots, stop),
+            daemon=True,
+        )
+        reader.start()
+        try:
+            while True:
+                itm = texts.get()
+                if itm is _DONE:
+                    break
+                if isinstance(itm, Exception):
+                    raise itm
+                pending.append(pool.submit(parse_gbk.parse_text, *itm))
+                while pending and (
+                    pending[0].done() or len(pending) >= queue_size
+                ):
+                    _count_next(pending.popleft(), count, record, slots)
+            while pending:
+                _count_next(pending.popleft(), count, record, slots)
+        finally:
+            stop.set()
+            for future in pending:
+                future.cancel()
+            reader.join()
+    return record
+
+
+def _read(paths, texts, slots, stop):
+    """
+    Read the GenBank files onto the queue, stopping early if the pipeline stops
+    :param paths <list<str>>: paths to the GenBank files
+    :param texts <queue.Queue>: queue of (path, contents) for each file,
+        followed by _DONE or the error that stopped the reading
+    :param slots <threading.Semaphore>: acquired before each file is read
+    :param stop <threading.Event>: set when the pipeline has stopped
+    """
+    try:
+        for path in paths:
+            if not _acquire(slots, stop):
+                return
+            texts.put((path, _read_text(path)))
+        texts.put(_DONE)
+    except Exception as err:
+        texts.put(err)
+
+
+def _read_text(path):
+    """ Read the contents of a GenBank file """
+    try:
+        with open(path) as fh:
+            return fh.read()
+    except Exception as err:
+        raise parse_gbk.GenBankParsingError(f"Unable to read {path}: {err}")
+
+
+def _acquire(slots, stop):
+    """
+    Wait for a free slot for the next file
+    :returns <bool>: False if the pipeline stopped before a slot was free
+    """
+    while not stop.is_set():
+        if slots.acquire(timeout=_WAIT_TIMEOUT):
+            return True
+    return False
+
+
+def _count_next(future, count, record, slots):
+    """
+    Count the proteins of the next parsed GenBank file, add them to the record
+    and free its slot. Errors from parsing are raised here.
+    """
+    _add(future.result(), count, record)
+    slots.release()
+
+
+def _add(rec, count, record):
+    """ Count the proteins of a parsed GenBank file and add them to record """
+    record["ids"].append(rec["id"])
+    record["proteins"].extend(count(rec["proteins"]))
@@ -0,0 +1,227 @@
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from collections import OrderedDict
+
+# Fields of struct.gbk.PROTEIN_INFO that are never stored in the cache. The
+# labels are specific to a protein in a genome and the sequences are already
+# part of the key, so they are re-attached to each cached result.
+PROTEIN_FIELDS = [
+    "gene",
+    "protein_id",
+    "protein_sequence",
+    "nucleotide_sequence",
+]
+
+# Default maximum number of results kept in the cache. A UNN calculation result
+# takes about 2 KB.
+DEFAULT_MAX_ENTRIES = 100000
+
+# Version of the layout of the cache file
+CACHE_FORMAT = 1
+
+# Modules whose code determines the cached results. A cache file written with
+# different code is discarded.
+SOURCE_FILES = [
+    os.path.join("protein", "codon_counts.py"),
+    os.path.join("protein", "consecutive_counts.py"),
+    os.path.join("protein", "unn_calculations.py"),
+    os.path.join("struct", "codon_counts.py"),
+    os.path.join("struct", "consecutive_counts.py"),
+    os.path.join("struct", "gbk.py"),
+    os.path.join("struct", "unn_calculations.py"),
+]
+
+
+class SequenceCache:
+    """
+    Memoize per-protein results by the hash of the protein's sequences, so that
+    identical CDSs found in several genomes are only computed once. Results are
+    kept in least recently used order and the oldest ones are evicted once
+    there are more than `max_entries` of them. The size of the cache is bounded
+    by this number of results, not by bytes. If a path is given, the cache is
+    loaded from and saved to that file.
+
+    Cached results are shared rather than copied, so they must not be modified
+    by the caller.
+    """
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        :param path <str>: path to the cache file (if null, the cache is only
+            kept in memory)
+        :param max_entries <int>: maximum number of results kept in the cache
+        """
+        assert max_entries > 0, f"Invalid cache size: {max_entries}"
+        self.header = {"format": CACHE_FORMAT, "version": _code_version()}
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = {}    # {namespace} -> count
+        self.misses = {}  # {namespace} -> count
+        # ({namespace}, {digest}) -> (result, names of PROTEIN_FIELDS it had)
+        self._entries = OrderedDict()
+        if path is not None and os.path.isfile(path):
+            self._load()
+
+    def get(self, namespace, protein, compute, *extra):
+        """
+        Get the result for a protein, computing it if it is not in the cache
+        :param namespace <str>: name of the calculation the result is for
+        :param protein <dict>: protein info, with at least the fields in
+            struct.gbk.PROTEIN_INFO
+        :param compute <function>: called with the protein and `extra` when the
+            result is not in the cache
+        :param extra: any other parameters that the result depends on
+        :returns <dict>: the result, with the fields of PROTEIN_FIELDS that
+            `compute` returned taken from the protein
+        """
+        key = (namespace, _digest(protein, extra))
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits[namespace] = self.hits.get(namespace, 0) + 1
+            stored, fields = self._entries[key]
+            result = dict(stored)
+            for field in fields:
+                result[field] = protein[field]
+        else:
+            self.misses[namespace] = self.misses.get(namespace, 0) + 1
+            result = compute(protein, *extra)
+            stored = {
+                k: v for k, v in result.items() if k not in PROTEIN_FIELDS
+            }
+            fields = tuple(f for f in PROTEIN_FIELDS if f in result)
+            self._entries[key] = (stored, fields)
+            self._evict()
+        return result
+
+    def hit_rate(self, namespace):
+        """
+        :param namespace <str>: name of the calculation
+        :returns <float>: percentage of lookups that were found in the cache
+        """
+        hits = self.hits.get(namespace, 0)
+        total = hits + self.misses.get(namespace, 0)
+        if total == 0:
+            return 0.0
+        return hits / total * 100
+
+    def metrics(self):
+        """
+        :returns <dict>: {namespace} -> {"hits": int, "misses": int,
+            "hit_rate": float}
+        """
+        namespaces = sorted(set(self.hits) | set(self.misses))
+        return {
+            ns: {
+                "hits": self.hits.get(ns, 0),
+                "misses": self.misses.get(ns, 0),
+                "hit_rate": round(self.hit_rate(ns), 2),
+            }
+            for ns in namespaces
+        }
+
+    def report(self, file=None):
+        """
+        Print the hit rate of each calculation
+        :param file: where to print the report (if null, stderr is used)
+        """
+        file = sys.stderr if file is None else file
+        for namespace, stats in self.metrics().items():
+            print(
+                f"{namespace}: {stats['hits']} cache hits, {stats['misses']} " \
+                f"misses ({stats['hit_rate']}% hit rate)",
+                file=file,
+            )
+
+    def save(self):
+        """
+        Write the cache to its path, if it has one. The cache is written to a
+        temporary file that then replaces the path, so runs that share a cache
+        file never leave a partly written one.
+        """
+        if self.path is None:
+            return
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(self.path)),
+            prefix=f".{os.path.basename(self.path)}.",
+        )
+        try:
+            with os.fdopen(fd, "wb") as out:
+                pickle.dump(
+                    {"header": self.header, "entries": self._entries},
+                    out,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _load(self):
+        """
+        Read the cache from its path. The cache is discarded if it cannot be
+        read or if it was written with a different format or different code.
+        """
+        try:
+            with open(self.path, "rb") as fh:
+                cached = pickle.load(fh)
+        except Exception as err:
+            _warn_discarded(self.path, f"it could not be read ({err})")
+            return
+        if not isinstance(cached, dict) or cached.get("header") != self.header:
+            _warn_discarded(
+                self.path, "it was written by a different version of the code"
+            )
+            return
+        entries = cached.get("entries")
+        if not isinstance(entries, OrderedDict):
+            _warn_discarded(self.path, "it has an unexpected format")
+            return
+        self._entries = entries
+        self._evict()
+
+    def _evict(self):
+        """ Remove the least recently used results beyond max_entries """
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _warn_discarded(path, reason):
+    print(f"WARNING: discarding cache {path}, {reason}", file=sys.stderr)
+
+
+def _code_version():
+    """
+    Hash the modules that determine the cached results
+    :returns <str>: hex digest
+    """
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sha = hashlib.sha1()
+    for path in SOURCE_FILES:
+        with open(os.path.join(package_dir, path), "rb") as fh:
+            sha.update(fh.read())
+    return sha.hexdigest()
+
+
+def _digest(protein, extra=()):
+    """
+    Hash the sequences of a protein along with any other parameters
+    :param protein <dict>: protein info
+    :param extra <tuple>: other parameters that the result depends on
+    :returns <str>: hex digest
+    """
+    sha = hashlib.sha1()
+    sha.update(protein["protein_sequence"].encode())
+    sha.update(b"\0")
+    sha.update(protein["nucleotide_sequence"].encode())
+    for itm in extra:
+        if isinstance(itm, (set, frozenset)):
+            itm = sorted(itm)
+        sha.update(b"\0")
+        sha.update(repr(itm).encode())
+    return sha.hexdigest()
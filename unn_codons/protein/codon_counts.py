@@ -5,23 +5,32 @@ class CodonError(Exception): pass
 class CodonCountError(CodonError): pass
 
 
-def count(proteins):
+def count(proteins, cache=None):
     """
     Count the number of codons in each protein, organized by the residue they
     encode
     :param proteins <list<struct.gbk.PROTEIN>>: proteins from the GenBank file
+    :param cache <protein.cache.SequenceCache>: cache of results for proteins
+        that have already been seen (if null, every protein is counted)
     :returns <list<struct.codon_counts.CODON>>: proteins with their codon counts
     """
     try:
         codons = []
         for protein in proteins:
-            codon = CODON.validate(_count_codons(protein))
+            if cache is None:
+                codon = _validated_count(protein)
+            else:
+                codon = cache.get("codon_counts", protein, _validated_count)
             codons.append(codon)
         return codons
     except Exception as err:
         raise CodonCountError(f"Unable to count codons in proteins: {err}")
 
 
+def _validated_count(protein):
+    return CODON.validate(_count_codons(protein))
+
+
 def _count_codons(protein):
     """
     Count the codons in a protein
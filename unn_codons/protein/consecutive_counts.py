@@ -6,17 +6,24 @@ class ConsecutiveError(Exception): pass
 class ConsecutiveCountError(ConsecutiveError): pass
 
 
-def count(proteins):
+def count(proteins, cache=None):
     """
     Count the number of consecutive UNN codons
     :param proteins <list<struct.gbk.PROTEIN>>: proteins from the GenBank file
+    :param cache <protein.cache.SequenceCache>: cache of results for proteins
+        that have already been seen (if null, every protein is counted)
     :returns <list<struct.consecutive_counts.CONSECUTIVE>>: proteins with their consecutive
         UNN codon counts
     """
     try:
         consecutives = []
         for protein in proteins:
-            consecutive = CONSECUTIVE.validate(_count_consecutives(protein))
+            if cache is None:
+                consecutive = _validated_count(protein)
+            else:
+                consecutive = cache.get(
+                    "consecutive_counts", protein, _validated_count
+                )
             consecutives.append(consecutive)
         return consecutives 
     except Exception as err:
@@ -25,6 +32,10 @@ def count(proteins):
         )
 
 
+def _validated_count(protein):
+    return CONSECUTIVE.validate(_count_consecutives(protein))
+
+
 def _count_consecutives(protein):
     """
     Count the consecutive UNN codons in a protein
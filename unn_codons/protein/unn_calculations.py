@@ -4,7 +4,7 @@ class UNNCalculationError(Exception): pass
 class CalculationError(UNNCalculationError): pass
 
 
-def calculate(proteins, include=set()):
+def calculate(proteins, include=set(), cache=None):
     """
     For all proteins in the genome, calculate the frequency of the various
     UNN codons. Calculate summary statistics across all proteins.
@@ -12,15 +12,23 @@ def calculate(proteins, include=set()):
         protein in the genome
     :param include <set<str>>: set of UNN codons to include. If empty, all UNN
         codons are included
+    :param cache <protein.cache.SequenceCache>: cache of results for proteins
+        that have already been seen (if null, every protein is calculated)
     :returns: <list<struct.unn_calculations.TABLE_DATA>>: calculated UNN
         frequencies for each protein for the final table
     """
     try:
         protein_stats = []
         for protein in proteins:
-            one_protein_stats = TABLE_DATA.validate(
-                _calculate_unn(protein, include)
-            )
+            if cache is None:
+                one_protein_stats = _validated_calculation(protein, include)
+            else:
+                one_protein_stats = cache.get(
+                    "unn_calculations",
+                    protein,
+                    _validated_calculation,
+                    include,
+                )
             protein_stats.append(one_protein_stats)
         return protein_stats
     except Exception as err:
@@ -29,6 +37,10 @@ def calculate(proteins, include=set()):
         )
 
 
+def _validated_calculation(protein, include=set()):
+    return TABLE_DATA.validate(_calculate_unn(protein, include))
+
+
 def _calculate_unn(protein, include=set()):
     """
     Calculate the UNN codon frequecies for a protein